@@ -3,6 +3,30 @@ import psycopg2
 from psycopg2 import OperationalError          # reconnect check
 import pandas as pd
 import uuid
+from sqlalchemy import create_engine
+
+# ───────────────────────────────────────────────────────────────
+# 0. One SQLAlchemy engine (and pool) per process, for every page
+# ───────────────────────────────────────────────────────────────
+@st.cache_resource(show_spinner=False)
+def get_engine():
+    """Shared by every page and session.
+
+    Sized for several concurrent sessions; a checkout that cannot get a
+    connection within 5 s fails fast instead of hanging the rerun.
+    Neon drops idle connections after ~5 min, so connections are recycled
+    before that; recycling goes by age only, so ``pool_pre_ping`` still
+    tests each checkout and swaps out connections killed by a restart or
+    proxy drop (same concern as ``DatabaseManager._ensure_live_conn``).
+    Most reads are served by ``st.cache_data`` and never check out.
+    """
+    return create_engine(
+        st.secrets["neon"]["dsn"],
+        pool_size=10, max_overflow=20, pool_timeout=5,
+        pool_recycle=300, pool_pre_ping=True,
+        connect_args={"keepalives": 1, "keepalives_idle": 30},
+        echo=False,
+    )
 
 # ───────────────────────────────────────────────────────────────
 # 1. One cached connection per user session
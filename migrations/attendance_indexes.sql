@@ -0,0 +1,44 @@
+-- Indexes backing pages/attendance.py.
+-- Run outside a transaction block (CONCURRENTLY), e.g.
+--   psql "$NEON_DSN" -f migrations/attendance_indexes.sql
+-- Safe to re-run, except ix_hr_att_hist_open: see the notes on it below.
+
+-- schedule in force for (employee, date): SQL_SCHED_JOIN walks this
+-- backwards from the punch date and stops at the first row
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hr_att_hist_emp_from
+    ON hr_attendance_history (employeeid, effective_from DESC)
+    INCLUDE (clock_in, clock_out, effective_to);
+
+-- "Active only" schedule view: open rows (effective_to IS NULL).
+-- UNIQUE: at most one open schedule per employee; close_current_and_add
+-- relies on this.
+--
+-- Pre-check: the build fails if any employee already has two open rows.
+-- This must return no rows; otherwise close the extra rows (set
+-- effective_to) first:
+--   SELECT employeeid, count(*) AS open_rows
+--   FROM   hr_attendance_history
+--   WHERE  effective_to IS NULL
+--   GROUP  BY employeeid
+--   HAVING count(*) > 1;
+--
+-- Recovery: a failed CONCURRENTLY build leaves an INVALID index behind,
+-- and IF NOT EXISTS then skips it on every re-run. After fixing the data:
+--   DROP INDEX CONCURRENTLY IF EXISTS ix_hr_att_hist_open;
+-- and run this file again. Check with
+--   SELECT indisvalid FROM pg_index
+--   WHERE  indexrelid = 'ix_hr_att_hist_open'::regclass;
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_hr_att_hist_open
+    ON hr_attendance_history (employeeid)
+    WHERE effective_to IS NULL;
+
+-- daily grid: SQL_DAY filters on punch_date = :d
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hr_att_date_emp
+    ON hr_attendance (punch_date, employeeid)
+    INCLUDE (clock_in, clock_out);
+
+-- log history: SQL_RANGE filters on employeeid + punch_date range and
+-- orders by punch_date; index-only scan, rows come back pre-sorted
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hr_att_emp_date
+    ON hr_attendance (employeeid, punch_date)
+    INCLUDE (clock_in, clock_out);
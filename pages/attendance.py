@@ -1,57 +1,90 @@
 import streamlit as st
-import datetime, math
+import datetime
+import functools
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
-# ─── DB ENGINE (cached) ──────────────────────────────────────────
-if "pg_engine" not in st.session_state:
-    st.session_state.pg_engine = create_engine(
-        st.secrets["neon"]["dsn"], pool_pre_ping=True, echo=False
-    )
-engine = st.session_state.pg_engine
+from db_handler import get_engine
+
+# ─── DB ENGINE (shared, see db_handler.get_engine) ──────────────
+engine = get_engine()
 
 # ─── SQL SNIPPETS ────────────────────────────────────────────────
+# shift length in hours; overnight shifts (out < in) wrap by one day
 SQL_SHIFT_HRS = """
-CASE
-  WHEN h.clock_out >= h.clock_in
-    THEN (EXTRACT(EPOCH FROM h.clock_out) - EXTRACT(EPOCH FROM h.clock_in)) / 3600
-  ELSE (EXTRACT(EPOCH FROM h.clock_out) + 86400 - EXTRACT(EPOCH FROM h.clock_in)) / 3600
-END
+EXTRACT(EPOCH FROM (h.clock_out - h.clock_in
+                    + (h.clock_out < h.clock_in)::int * INTERVAL '1 day')) / 3600
+"""
+
+# whole worked seconds per closed punch; NULL while still clocked in
+# (no NOW(): cached results stay valid, open rows are filled in live by
+# _with_open_punches)
+SQL_WORKED = """
+CROSS JOIN LATERAL (
+  SELECT EXTRACT(EPOCH FROM (a.clock_out - a.clock_in))::int AS secs
+) w
 """
 
+# schedule in force on each row's punch date (range view: dates differ per
+# row): one index probe per punch (ix_hr_att_hist_emp_from, see
+# migrations/attendance_indexes.sql)
+SQL_SCHED_JOIN = """
+LEFT JOIN LATERAL (
+  SELECT clock_in, clock_out
+  FROM   hr_attendance_history
+  WHERE  employeeid = a.employeeid
+    AND  effective_from <= a.punch_date
+    AND  COALESCE(effective_to, a.punch_date) >= a.punch_date
+  ORDER  BY effective_from DESC
+  LIMIT  1
+) h ON TRUE
+"""
+
+# display columns shared by the day & range queries
+SQL_PUNCH_COLS = f"""
+       a.clock_in, a.clock_out,
+       COALESCE(to_char(a.clock_in,  'HH24:MI'), '—') AS clock_in_str,
+       COALESCE(to_char(a.clock_out, 'HH24:MI'), '—') AS clock_out_str,
+       ({SQL_SHIFT_HRS})::float8 AS shift_hours,
+       w.secs / 3600.0::float8 AS hours,
+       to_char(make_interval(secs => w.secs), 'HH24 "h" MI "m"') AS net_str,
+       COALESCE(a.clock_in::time > h.clock_in + INTERVAL '5 minutes', FALSE) AS late
+"""
+
+# one date for every row: resolve each employee's schedule once, then hash
+# join, instead of a LATERAL probe per punch
 SQL_DAY = text(f"""
+WITH sched AS (
+  SELECT DISTINCT ON (employeeid) employeeid, clock_in, clock_out
+  FROM   hr_attendance_history
+  WHERE  effective_from <= :d
+    AND  COALESCE(effective_to, :d) >= :d
+  ORDER  BY employeeid, effective_from DESC
+)
 SELECT e.fullname,
-       a.clock_in, a.clock_out,
-       h.clock_in AS expected_in,
-       {SQL_SHIFT_HRS} AS shift_hours,
-       EXTRACT(EPOCH FROM (COALESCE(a.clock_out, NOW()) - a.clock_in)) AS secs
+       {SQL_PUNCH_COLS}
 FROM   hr_attendance a
 JOIN   hr_employee  e USING (employeeid)
-LEFT JOIN hr_attendance_history h
-       ON h.employeeid = a.employeeid
-      AND h.effective_from <= :d
-      AND COALESCE(h.effective_to, :d) >= :d
+LEFT JOIN sched     h ON h.employeeid = a.employeeid
+{SQL_WORKED}
 WHERE a.punch_date = :d
 ORDER BY e.fullname
 """)
 
 SQL_RANGE = text(f"""
 SELECT a.punch_date,
-       a.clock_in, a.clock_out,
        h.clock_in AS expected_in,
-       {SQL_SHIFT_HRS} AS shift_hours,
-       EXTRACT(EPOCH FROM (COALESCE(a.clock_out, NOW()) - a.clock_in)) AS secs
+       {SQL_PUNCH_COLS}
 FROM   hr_attendance a
-LEFT JOIN hr_attendance_history h
-       ON h.employeeid = a.employeeid
-      AND h.effective_from <= a.punch_date
-      AND COALESCE(h.effective_to, a.punch_date) >= a.punch_date
+{SQL_SCHED_JOIN}
+{SQL_WORKED}
 WHERE a.employeeid = :eid
   AND a.punch_date BETWEEN :s AND :e
 ORDER BY a.punch_date
 """)
 
-SQL_SCHEDULE_ALL = text("""
+SQL_SCHEDULES = """
 SELECT h.att_id,
        e.employeeid,
        e.fullname,
@@ -64,65 +97,127 @@ SELECT h.att_id,
        h.reason
 FROM   hr_attendance_history h
 JOIN   hr_employee           e USING (employeeid)
+{where}
 ORDER  BY e.fullname, h.effective_from
+"""
+SQL_SCHEDULE_ALL    = text(SQL_SCHEDULES.format(where=""))
+# open rows only: at most one per employee (ix_hr_att_hist_open)
+SQL_SCHEDULE_ACTIVE = text(SQL_SCHEDULES.format(where="WHERE  h.effective_to IS NULL"))
+
+# close the open schedule row and insert its successor in one round-trip.
+# The INSERT reads from `closed` so the UPDATE finishes first; otherwise the
+# unique open-row index (ix_hr_att_hist_open) would see two open rows.
+SQL_REPLACE_SCHEDULE = text("""
+WITH closed AS (
+    UPDATE hr_attendance_history
+       SET effective_to = :to
+     WHERE employeeid = :eid AND effective_to IS NULL
+    RETURNING 1
+)
+INSERT INTO hr_attendance_history
+      (employeeid, work_days_per_week, off_day,
+       clock_in, clock_out, effective_from, reason)
+SELECT :eid, :wd, :off, :cin, :cout, :eff, :rsn
+FROM   (SELECT count(*) FROM closed) c
 """)
 
-# ─── DB HELPERS ─────────────────────────────────────────────────
-def fetch_day(day: datetime.date) -> pd.DataFrame:
-    df = pd.read_sql(SQL_DAY, engine, params={"d": day})
-    if df.empty: return df
-    df["clock_in_str"]  = pd.to_datetime(df.clock_in).dt.strftime("%H:%M")
-    df["clock_out_str"] = pd.to_datetime(df.clock_out).dt.strftime("%H:%M")
-    df["hours"]   = df.secs / 3600
-    df["net_str"] = df.secs.apply(lambda s:f"{int(s//3600):02d} h {int((s%3600)//60):02d} m")
-    df["late"]    = df.apply(
-        lambda r: False if r.expected_in is None else
-        (pd.notna(r.clock_in) and
-         r.clock_in.time() >
-         (datetime.datetime.combine(datetime.date.today(), r.expected_in) +
-          datetime.timedelta(minutes=5)).time()),
-        axis=1)
+SQL_EMPLOYEES = text("SELECT employeeid, fullname FROM hr_employee ORDER BY fullname")
+
+# the database's clock, both ways: LOCALTIMESTAMP (session time zone) pairs
+# with `timestamp` punches, NOW() with `timestamptz` ones
+SQL_NOW = text("SELECT LOCALTIMESTAMP AS local_now, NOW() AS now")
+
+# ─── DB HELPERS (cached per args; cleared on schedule writes) ───
+FAST_TTL = 60    # punches: new clock-ins show up within a minute
+SLOW_TTL = 600   # employees / schedules: rarely change, cleared on writes
+
+@functools.cache
+def _compiled(sql) -> str:
+    """Driver-level SQL for a module-level text() constant (compiled once)."""
+    return str(sql.compile(dialect=engine.dialect))
+
+def _read(sql, **params) -> pd.DataFrame:
+    """Run *sql* on a raw DB-API cursor and build the frame from its tuples
+    (no SQLAlchemy Result/Row objects, no pd.read_sql re-inference)."""
+    con = engine.raw_connection()
+    try:
+        with con.cursor() as cur:
+            cur.execute(_compiled(sql), params)
+            cols = [c[0] for c in cur.description]
+            return pd.DataFrame.from_records(cur.fetchall(), columns=cols)
+    finally:
+        con.close()       # back to the pool (rolled back on return)
+
+def _with_open_punches(df: pd.DataFrame) -> pd.DataFrame:
+    """Fill hours / net_str for punches still open, counted up to now.
+
+    Done after the cache so open rows keep ticking between refetches. "Now"
+    is read from the database (one uncached query, only when something is
+    open), so it means what NOW() did in SQL whatever the app server's time
+    zone and whether clock_in is `timestamp` or `timestamptz`."""
+    df["hours"] = df.hours.astype(float)
+    open_ = df.clock_out.isna() & df.clock_in.notna()
+    if open_.any():
+        cin = df.clock_in[open_]
+        now = _read(SQL_NOW).iloc[0]
+        if cin.iloc[0].tzinfo is None:
+            elapsed = pd.Timestamp(now.local_now) - pd.to_datetime(cin)
+        else:   # aware; utc=True also copes with mixed offsets (DST)
+            elapsed = pd.Timestamp(now.now) - pd.to_datetime(cin, utc=True)
+        secs = elapsed.dt.total_seconds().clip(lower=0)
+        df.loc[open_, "hours"] = secs / 3600
+        comp = pd.to_timedelta(secs, unit="s").dt.components
+        df.loc[open_, "net_str"] = ((comp.days * 24 + comp.hours).astype(str).str.zfill(2) + " h "
+                                    + comp.minutes.astype(str).str.zfill(2) + " m")
     return df
 
+@st.cache_data(ttl=FAST_TTL, max_entries=256, show_spinner=False)
+def _fetch_recent_day(day: datetime.date) -> pd.DataFrame:
+    return _read(SQL_DAY, d=day)
+
+# days before yesterday are settled (no overnight punches still being
+# closed), so they survive restarts; dropped on schedule writes, employee
+# edits (employee_management clears all caches) and "Reload punches"
+@st.cache_data(persist="disk", max_entries=400, show_spinner=False)
+def _fetch_past_day(day: datetime.date) -> pd.DataFrame:
+    return _read(SQL_DAY, d=day)
+
+def fetch_day(day: datetime.date) -> pd.DataFrame:
+    """Punches for *day*; relies on ix_hr_att_date_emp and
+    ix_hr_att_hist_emp_from (migrations/attendance_indexes.sql)."""
+    if day < datetime.date.today() - datetime.timedelta(days=1):
+        return _with_open_punches(_fetch_past_day(day))
+    return _with_open_punches(_fetch_recent_day(day))
+
+@st.cache_data(ttl=FAST_TTL, max_entries=256, show_spinner=False)
+def _fetch_range(eid:int, s:datetime.date, e:datetime.date) -> pd.DataFrame:
+    return _read(SQL_RANGE, eid=eid, s=s, e=e)
+
 def fetch_range(eid:int, s:datetime.date, e:datetime.date) -> pd.DataFrame:
-    df = pd.read_sql(SQL_RANGE, engine, params={"eid":eid,"s":s,"e":e})
-    if df.empty: return df
-    df["clock_in_str"]  = pd.to_datetime(df.clock_in).dt.strftime("%H:%M")
-    df["clock_out_str"] = pd.to_datetime(df.clock_out).dt.strftime("%H:%M")
-    df["hours"] = df.secs / 3600
-    df["late"]  = df.apply(
-        lambda r: False if r.expected_in is None else
-        (pd.notna(r.clock_in) and
-         pd.to_datetime(r.clock_in).time() >
-         (datetime.datetime.combine(datetime.date.today(), r.expected_in) +
-          datetime.timedelta(minutes=5)).time()),
-        axis=1)
-    return df
+    return _with_open_punches(_fetch_range(eid, s, e))
 
-def list_employees() -> pd.DataFrame:
-    return pd.read_sql(
-        "SELECT employeeid, fullname FROM hr_employee ORDER BY fullname", engine)
+@st.cache_data(ttl=SLOW_TTL, show_spinner=False)
+def employee_index() -> tuple[list, dict]:
+    """Names in display order plus a name → employeeid map."""
+    df = _read(SQL_EMPLOYEES)
+    return df.fullname.tolist(), dict(zip(df.fullname, df.employeeid.astype(int)))
 
+@st.cache_data(ttl=SLOW_TTL, show_spinner=False)
 def fetch_all_schedules() -> pd.DataFrame:
-    return pd.read_sql(SQL_SCHEDULE_ALL, engine)
+    return _read(SQL_SCHEDULE_ALL)
+
+@st.cache_data(ttl=SLOW_TTL, show_spinner=False)
+def fetch_active_schedules() -> pd.DataFrame:
+    return _read(SQL_SCHEDULE_ACTIVE)
 
 # close current open row & insert new one  -----------------------
 def close_current_and_add(eid:int, payload:dict):
     """Close existing open schedule and insert a new row."""
     close_to = payload["eff"] - datetime.timedelta(days=1)
     with engine.begin() as con:
-        con.execute(text("""
-            UPDATE hr_attendance_history
-               SET effective_to = :to
-             WHERE employeeid = :eid AND effective_to IS NULL
-        """), {"eid": eid, "to": close_to})
-        con.execute(text("""
-            INSERT INTO hr_attendance_history
-                  (employeeid, work_days_per_week, off_day,
-                   clock_in, clock_out, effective_from, reason)
-            VALUES (:eid, :wd, :off, :cin, :cout, :eff, :rsn)
-        """), {
+        con.execute(SQL_REPLACE_SCHEDULE, {
             "eid": eid,
+            "to":  close_to,
             "wd":  payload["wd"],
             "off": payload["off"],
             "cin": payload["cin"],
@@ -130,18 +225,25 @@ def close_current_and_add(eid:int, payload:dict):
             "eff": payload["eff"],
             "rsn": payload["rsn"]
         })
+    # expected clock-in / shift length feed the day & range views too
+    for fn in (fetch_all_schedules, fetch_active_schedules,
+               _fetch_recent_day, _fetch_past_day, _fetch_range):
+        fn.clear()
 
 # ─── UTILITIES ─────────────────────────────────────────────────
-dow = ["Sun","Mon","Tue","Wed","Thu","Fri","Sat"]
-
-def fmt_time(t):
-    if pd.isna(t): return "—"
-    if isinstance(t, datetime.time): return t.strftime("%H:%M")
-    return pd.to_datetime(t).strftime("%H:%M")
-
-def fmt_date(d):
-    if pd.isna(d): return "—"
-    return d.date().isoformat() if hasattr(d,"date") else str(d)
+DOW = ("Sun","Mon","Tue","Wed","Thu","Fri","Sat")
+DOW_IDX = {d: i for i, d in enumerate(DOW)}
+DOW_OR_DASH = np.array(DOW + ("—",))
+
+def hhmm(mins, signed=False):
+    """Vectorised HH:MM (±HH:MM if *signed*) for an array of minutes; NaN → "—"."""
+    m = np.asarray(mins, dtype=float)
+    a = np.abs(np.nan_to_num(m)).astype(np.int64)
+    txt = np.char.add(np.char.add(np.char.zfill((a // 60).astype(str), 2), ":"),
+                      np.char.zfill((a % 60).astype(str), 2))
+    if signed:
+        txt = np.char.add(np.where(m >= 0, "+", "−"), txt)
+    return np.where(np.isnan(m), "—", txt)
 
 def clean_off_index(val):
     if pd.isna(val): return 0
@@ -153,6 +255,17 @@ def safe_int(val, default=0):
     try: return int(val)
     except Exception: return default
 
+# daily-grid card styles: built once at import, not re-formatted per rerun
+GRID_CSS = """<style>
+.att-grid{display:grid;grid-template-columns:repeat(5,minmax(0,1fr));column-gap:12px}
+.att-card{border:1px solid #DDD;border-radius:8px;padding:14px 16px;height:170px;
+display:flex;flex-direction:column;justify-content:space-between;margin-bottom:18px}
+.att-card h4{font-size:0.95rem;margin:0 0 6px;white-space:nowrap;overflow:hidden;text-overflow:ellipsis}
+.small{font-size:0.78rem;margin:1px 0}.in{font-weight:600}.out{color:#e0a800;font-weight:600}
+</style>"""
+PAGE_SIZE = 50    # cards per grid page
+STATIC_TABLE_MAX = 31    # log rows shown as st.table rather than st.dataframe
+
 # ─── UI CONFIG ──────────────────────────────────────────────────
 st.set_page_config("Attendance", "⏱", layout="wide")
 st.title("⏱ Attendance")
@@ -162,51 +275,65 @@ tab_grid, tab_log, tab_sched = st.tabs(
 )
 
 # ╔═════════ TAB 1 — DAILY GRID ══════════════════════════════════
-with tab_grid:
-    dsel = st.date_input(
+# fragment: picking a date reruns only the grid
+@st.fragment
+def grid_tab():
+    date_col, reload_col = st.columns([5, 1], vertical_alignment="bottom")
+    dsel = date_col.date_input(
         "Select date",
         datetime.date.today(),
         min_value=datetime.date.today() - datetime.timedelta(days=365),
         max_value=datetime.date.today()
     )
+    # past days stay cached (on disk) until a write clears them; this picks
+    # up punches corrected directly in the database
+    if reload_col.button("🔄 Reload punches", key="grid_reload", use_container_width=True):
+        _fetch_past_day.clear()
+        _fetch_recent_day.clear()
     day_df = fetch_day(dsel)
     if day_df.empty:
         st.info("No punches recorded.")
     else:
-        st.markdown("""
-<style>
-.att-card{border:1px solid #DDD;border-radius:8px;padding:14px 16px;height:170px;
-display:flex;flex-direction:column;justify-content:space-between;margin-bottom:18px}
-.att-card h4{font-size:0.95rem;margin:0 0 6px;white-space:nowrap;overflow:hidden;text-overflow:ellipsis}
-.small{font-size:0.78rem;margin:1px 0}.in{font-weight:600}.out{color:#e0a800;font-weight:600}
-</style>""", unsafe_allow_html=True)
-
-        COLS, total_rows = 5, math.ceil(len(day_df)/5)
-        it = iter(day_df.to_dict("records"))
         st.subheader(f"{dsel:%A, %B %d %Y}")
-        for _ in range(total_rows):
-            cols = st.columns(COLS, gap="small")
-            for c in cols:
-                try:
-                    r = next(it)
-                except StopIteration:
-                    c.empty(); continue
-                in_c  = "#dc3545" if r["late"] else "#1f77b4"
-                net_c = "#1a873b" if r["hours"] >= r["shift_hours"] else "#c0392b"
-                c.markdown(f"""
+        # bounded card count per render, whatever the head-count
+        n_pages = -(-len(day_df) // PAGE_SIZE)
+        page = st.number_input("Page", 1, n_pages, 1) if n_pages > 1 else 1
+        first = (page - 1) * PAGE_SIZE
+        shown = day_df.iloc[first : first + PAGE_SIZE]
+        st.caption(f"{len(day_df)} punches"
+                   + (f" • showing {first + 1}–{first + len(shown)}" if n_pages > 1 else ""))
+
+        cards = "".join(f"""
 <div class="att-card">
-<h4>{r['fullname']}</h4>
-<div class="small">IN  <span class="in" style="color:{in_c};">{r['clock_in_str']}</span></div>
-<div class="small">OUT <span class="out">{r['clock_out_str']}</span></div>
-<div class="small">NET <span style="color:{net_c};font-weight:600;">{r['net_str']}</span></div>
-</div>""", unsafe_allow_html=True)
+<h4>{name}</h4>
+<div class="small">IN  <span class="in" style="color:{'#dc3545' if late else '#1f77b4'};">{cin}</span></div>
+<div class="small">OUT <span class="out">{cout}</span></div>
+<div class="small">NET <span style="color:{'#1a873b' if hrs >= shift else '#c0392b'};font-weight:600;">{net}</span></div>
+</div>""" for name, late, cin, cout, hrs, shift, net in shown[
+            ["fullname", "late", "clock_in_str", "clock_out_str", "hours", "shift_hours", "net_str"]
+        ].itertuples(index=False, name=None))
+
+        # one element for the whole grid; st.html skips the markdown parser
+        # and, unlike components.html, needs no iframe or fixed height
+        st.html(f"""{GRID_CSS}
+<div class="att-grid">{cards}
+</div>""")
+
+with tab_grid:
+    grid_tab()
 
 # ╔═════════ TAB 2 — LOG HISTORY (fixed) ════════════════════════
-with tab_log:
+# fragment: employee / range changes rerun only this tab
+@st.fragment
+def log_tab():
     # ── employee selector ───────────────────────────────────────
-    emp_df = list_employees()
-    emp = st.selectbox("Employee", emp_df.fullname, key="log_emp")
-    eid = int(emp_df.loc[emp_df.fullname == emp, "employeeid"].iloc[0])
+    # list is cached for SLOW_TTL; pick up a just-added hire without waiting
+    pick_col, refresh_col = st.columns([5, 1], vertical_alignment="bottom")
+    if refresh_col.button("🔄 Refresh employees", key="log_emp_refresh", use_container_width=True):
+        employee_index.clear()
+    names, name_to_id = employee_index()
+    emp = pick_col.selectbox("Employee", names, key="log_emp")
+    eid = name_to_id[emp]
 
     # ── date-range (robust handling) ────────────────────────────
     today = datetime.date.today()
@@ -228,7 +355,7 @@ with tab_log:
 
     if s > e:
         st.error("Start must be ≤ End")
-        st.stop()
+        return
 
     # ── fetch log dataframe ─────────────────────────────────────
     d = fetch_range(eid, s, e)
@@ -236,54 +363,32 @@ with tab_log:
 
     if d.empty:
         st.info("Nothing recorded for this period.")
-        st.stop()
+        return
 
     # ── add derived / formatted columns ─────────────────────────
-    d["Req IN"] = d.expected_in.apply(fmt_time)
-    d["Req OUT"] = d.apply(
-        lambda r: "—"
-        if pd.isna(r.expected_in)
-        else (
-            datetime.datetime.combine(r.punch_date, r.expected_in)
-            + datetime.timedelta(hours=r.shift_hours)
-        ).strftime("%H:%M"),
-        axis=1,
-    )
-
-    def delta_str(row):
-        if pd.isna(row.hours) or pd.isna(row.shift_hours):
-            return "—"
-        minutes = int(round((row.hours - row.shift_hours) * 60))
-        sign = "+" if minutes >= 0 else "−"
-        return f"{sign}{abs(minutes)//60:02d}:{abs(minutes)%60:02d}"
-
-    d["Δ"] = d.apply(delta_str, axis=1)
-
-    # ── summary metrics (skip NaNs safely) ─────────────────────
-    total_hours = d.hours.fillna(0).sum()
-    req_hours   = d.shift_hours.fillna(0).sum()
+    exp_str  = d.expected_in.astype("string")          # "HH:MM:SS" / <NA>
+    d["Req IN"] = exp_str.str[:5].fillna("—")
+    exp_in = pd.to_timedelta(exp_str, errors="coerce")
+    d["Req OUT"] = hhmm((exp_in.dt.total_seconds() + d.shift_hours * 3600) // 60 % 1440)
+    delta_min    = np.round((d.hours - d.shift_hours) * 60)
+    d["Δ"]       = hhmm(delta_min, signed=True)
+
+    # ── summary metrics (one NaN-skipping reduction) ───────────
+    total_hours, req_hours = d[["hours", "shift_hours"]].sum()
     delta_hours = total_hours - req_hours
 
     st.metric("Total",    f"{total_hours:.2f}")
     st.metric("Required", f"{req_hours:.2f}")
     st.metric("Δ",        f"{delta_hours:+.2f}")
 
-    # ── styling helper for dataframe ───────────────────────────
-    def sty(row):
-        style = [""] * len(row)
-        # late IN
-        if row["Req IN"] != "—" and row["IN"] != "—":
-            exp = datetime.datetime.strptime(row["Req IN"], "%H:%M").time()
-            act = datetime.datetime.strptime(row["IN"], "%H:%M").time()
-            cut = (datetime.datetime.combine(today, exp) + datetime.timedelta(minutes=5)).time()
-            style[1] = "background-color:#f8d7da;" if act > cut else "background-color:#d1ecf1;"
-        # Δ cell
-        delta = row["Δ"]
-        if delta.startswith("+"):
-            style[-1] = "background-color:#d4edda;"
-        elif delta.startswith("−"):
-            style[-1] = "background-color:#f8d7da;"
-        return style
+    # ── cell styles, one array per column (no per-row strptime) ──
+    # lateness comes from SQL (`late`); only styled when both times exist
+    in_css = np.where(
+        d.expected_in.isna() | d.clock_in.isna(), "",
+        np.where(d.late, "background-color:#f8d7da;", "background-color:#d1ecf1;"))
+    delta_css = np.select(
+        [delta_min >= 0, delta_min < 0],
+        ["background-color:#d4edda;", "background-color:#f8d7da;"], "")
 
     # ── assemble view & show ───────────────────────────────────
     view = d[
@@ -296,48 +401,62 @@ with tab_log:
         }
     )
 
-    st.dataframe(
-        view.style.apply(sty, axis=1),
-        use_container_width=True,
-        hide_index=True,
-    )
+    # a month or less: static table, no interactive grid to mount.
+    # st.table always draws the index, so make it the Date column; only
+    # when dates are unique (two punches on one day would give Styler a
+    # duplicate index, which it rejects); otherwise the grid below
+    static = len(view) <= STATIC_TABLE_MAX and view.Date.is_unique
+    if static:
+        view = view.set_index("Date")
+
+    styled = (view.style.apply(lambda _: in_css, subset=["IN"])
+                        .apply(lambda _: delta_css, subset=["Δ"]))
+    if static:
+        st.table(styled)
+    else:
+        st.dataframe(styled, use_container_width=True, hide_index=True)
 
+with tab_log:
+    log_tab()
 
 # ╔═════════ TAB 3 — SCHEDULE / SHIFTS ═══════════════════════════
-with tab_sched:
-    sch = fetch_all_schedules()
+# fragment: selections & saves here rerun only this tab, not the
+# day/range queries and the grid above
+@st.fragment
+def schedule_tab():
+    scope = st.radio("View", ["Active only", "All history"], horizontal=True, key="sched_scope")
+    sch = fetch_active_schedules() if scope == "Active only" else fetch_all_schedules()
     if sch.empty:
-        st.info("No schedule rows found."); st.stop()
+        st.info("No schedule rows found."); return
+
+    # off_day → label via one array lookup; NULL / out-of-range → "—" (slot 7)
+    off_num = pd.to_numeric(sch.off_day, errors="coerce").to_numpy(dtype=float)
+    off_idx = np.where((off_num >= 0) & (off_num < 7), np.nan_to_num(off_num), 7).astype(int)
 
     view = pd.DataFrame({
         "Employee":        sch.fullname,
-        "Work days/wk":    sch.wd_per_wk.fillna("—"),
-        "Off‑day":         sch.off_day.apply(lambda v: dow[int(v)] if pd.notna(v) and 0<=int(v)<7 else "—"),
-        "Clock‑in":        sch.clock_in.apply(fmt_time),
-        "Clock‑out":       sch.clock_out.apply(fmt_time),
-        "Effective from":  sch.effective_from.apply(fmt_date),
-        "Effective to":    sch.effective_to.apply(fmt_date),
+        "Work days/wk":    sch.wd_per_wk.astype("Int64").astype("string").fillna("—"),
+        "Off‑day":         DOW_OR_DASH[off_idx],
+        "Clock‑in":        sch.clock_in.astype("string").str[:5].fillna("—"),
+        "Clock‑out":       sch.clock_out.astype("string").str[:5].fillna("—"),
+        "Effective from":  sch.effective_from.astype("string").fillna("—"),
+        "Effective to":    sch.effective_to.astype("string").fillna("—"),
         "Reason":          sch.reason.fillna(""),
         "att_id":          sch.att_id
     })
 
-    st.subheader("All employee schedules")
-    hdrs = ["Employee","Work days/wk","Off‑day","Clock‑in","Clock‑out",
-            "Effective from","Effective to","Reason",""]
-    head = st.columns(len(hdrs))
-    for c,h in zip(head,hdrs): c.markdown(f"**{h}**")
-
-    for _,row in view.iterrows():
-        cols = st.columns(len(hdrs))
-        for i, field in enumerate(view.columns[:-1]):
-            cols[i].markdown(str(row[field]))
-        if cols[-1].button("✏️", key=f"edit_{row.att_id}"):
-            st.session_state["edit_row"] = int(row.att_id)
+    st.subheader("Active schedules" if scope == "Active only" else "All employee schedules")
+    # click a row to edit it; keyed per scope so a selection never points
+    # into the other view's rows
+    table_key = f"sched_table_{scope}"
+    picked = st.dataframe(view.drop(columns="att_id"), use_container_width=True, hide_index=True,
+                          on_select="rerun", selection_mode="single-row", key=table_key)
+    rows = picked.selection.rows
 
     # ── inline edit form ────────────────────────────────────────
-    if "edit_row" in st.session_state and st.session_state["edit_row"] in set(sch.att_id):
-        rid = int(st.session_state["edit_row"])
-        rec = sch.loc[sch.att_id == rid].iloc[0]
+    if rows and rows[0] < len(sch):
+        rec = sch.iloc[rows[0]]
+        rid = int(rec.att_id)
 
         st.markdown("---")
         st.subheader(f"Edit schedule • {rec.fullname}")
@@ -347,7 +466,7 @@ with tab_sched:
                 safe_int(rec.wd_per_wk, 6), key=f"wd_{rid}")
 
             off = st.selectbox(
-                "Off‑day", dow,
+                "Off‑day", DOW,
                 index=clean_off_index(rec.off_day), key=f"off_{rid}")
 
             cin_def  = rec.clock_in  if pd.notna(rec.clock_in)  else datetime.time(8,0)
@@ -367,18 +486,19 @@ with tab_sched:
                     eid=int(rec.employeeid),
                     payload={
                         "wd":  int(wd),
-                        "off": dow.index(off),
+                        "off": DOW_IDX[off],
                         "cin": cin,
                         "cout": cout,
                         "eff": efff,
                         "rsn": rsn
                     }
                 )
-                st.session_state.pop("edit_row")
-                st.rerun()
+                st.session_state.pop(table_key, None)
+                st.rerun(scope="fragment")
 
             if cancel_btn.form_submit_button("❌ Cancel"):
-                st.session_state.pop("edit_row")
-                st.rerun()
-    else:
-        st.session_state.pop("edit_row", None)
+                st.session_state.pop(table_key, None)
+                st.rerun(scope="fragment")
+
+with tab_sched:
+    schedule_tab()
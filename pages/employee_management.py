@@ -1,19 +1,27 @@
 import math
 import streamlit as st, pandas as pd, datetime, mimetypes, uuid, os, urllib.parse, posixpath, requests   # ① added requests
-from sqlalchemy import create_engine, text
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
 from supabase import create_client
 
+from db_handler import get_engine
+
 TODAY, PAST_30 = datetime.date.today(), datetime.date.today() - datetime.timedelta(days=365*30)
 FUTURE_30 = TODAY + datetime.timedelta(days=365*30)
 
 # Keep original uploader handle
 file_uploader = st.file_uploader
 
-# Supabase client (service key)
+# Supabase client (service key): one per process, shared by all sessions
 sb_cfg = st.secrets["supabase"]
-_SB = create_client(sb_cfg["url"], sb_cfg["service"])
 BUCKET = sb_cfg["bucket"]
 
+@st.cache_resource(show_spinner=False)
+def get_sb():
+    return create_client(sb_cfg["url"], sb_cfg["service"])
+
+_SB = get_sb()
+
 def _upload_to_supabase(file_obj, folder):
     if file_obj is None: return None
     ext = os.path.splitext(file_obj.name)[1] or ""
@@ -22,10 +30,16 @@ def _upload_to_supabase(file_obj, folder):
     _SB.storage.from_(BUCKET).upload(key, file_obj.read(), {"content-type": mime})
     return _SB.storage.from_(BUCKET).create_signed_url(key, 60*60*24*7)["signedURL"]
 
+def _upload_attachments(cv_up, id_up, photo_up):
+    """Upload CV / national ID / photo side by side (network-bound, so the
+    form waits for the slowest file, not the sum); None for a missing file."""
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        jobs = [ex.submit(_upload_to_supabase, f, folder)
+                for f, folder in ((cv_up, "cv"), (id_up, "nid"), (photo_up, "photo"))]
+        return tuple(j.result() for j in jobs)
+
 # Postgres
-if "pg_engine" not in st.session_state:
-    st.session_state.pg_engine = create_engine(st.secrets["neon"]["dsn"], pool_pre_ping=True)
-engine = st.session_state.pg_engine
+engine = get_engine()
 
 def get_all_employees(): return pd.read_sql("SELECT * FROM hr_employee ORDER BY employeeid DESC", engine)
 
@@ -46,12 +60,16 @@ def add_employee_with_salary(emp, base):
                              (employeeid,salary,effective_from,reason)
                              VALUES (:eid,:sal,:eff,'Initial contract rate')"""),
                      {"eid": eid, "sal": base, "eff": emp["employment_date"]})
+    st.cache_data.clear()       # employee lists on the other pages
 
 def update_employee(eid, **cols):
     with engine.begin() as conn:
         conn.execute(text("UPDATE hr_employee SET " +
                     ", ".join(f"{k}=:{k}" for k in cols) +
                     " WHERE employeeid=:eid"), {**cols, "eid": eid})
+    # names are baked into other pages' cached frames, incl. attendance
+    # days persisted to disk (cleared there too)
+    st.cache_data.clear()
 
 def search_employees(term):
     return pd.read_sql(text("""
@@ -151,18 +169,19 @@ with tab_add:
             st.error("Please complete: " + ", ".join(missing))
             st.stop()
 
+        cv_url, id_url, photo_url = _upload_attachments(cv_up, id_up, photo_up)
         emp = dict(
             fullname=fullname, department=department, position=position,
             phone_no=phone_no, emergency_phone_no=emergency_phone_no,
             supervisor_phone_no=supervisor_phone_no, address=address,
             date_of_birth=date_of_birth, employment_date=employment_date,
-            health_condition=health_condition, cv_url=_upload_to_supabase(cv_up, "cv"),
-            national_id_image_url=_upload_to_supabase(id_up, "nid"),
+            health_condition=health_condition, cv_url=cv_url,
+            national_id_image_url=id_url,
             national_id_no=national_id_no, email=email, family_members=family_members,
             education_degree=education_degree, language=language,
             ss_registration_date=ss_registration_date, assurance=assurance,
             assurance_state=assurance_state, employee_state=employee_state,
-            photo_url=_upload_to_supabase(photo_up, "photo"),
+            photo_url=photo_url,
         )
 
         add_employee_with_salary(emp, basicsalary)
@@ -297,6 +316,7 @@ with tab_edit:
             st.error("Please correct: " + ", ".join(required_miss))
             st.stop()
 
+        cv_url, id_url, photo_url = _upload_attachments(cv_up, id_up, photo_up)
         update_employee(
             eid,
             fullname=fullname, department=department, position=position,
@@ -304,13 +324,13 @@ with tab_edit:
             supervisor_phone_no=supervisor_phone_no, address=address,
             date_of_birth=date_of_birth, employment_date=employment_date,
             health_condition=health_condition,
-            cv_url=_upload_to_supabase(cv_up, "cv") or row.cv_url,
-            national_id_image_url=_upload_to_supabase(id_up, "nid") or row.national_id_image_url,
+            cv_url=cv_url or row.cv_url,
+            national_id_image_url=id_url or row.national_id_image_url,
             national_id_no=national_id_no, email=email, family_members=family_members,
             education_degree=education_degree, language=language,
             ss_registration_date=ss_registration_date, assurance=assurance,
             assurance_state=assurance_state, employee_state=employee_state,
-            photo_url=_upload_to_supabase(photo_up, "photo") or row.photo_url,
+            photo_url=photo_url or row.photo_url,
         )
         st.success("Employee updated successfully!  New files (if any) uploaded to Supabase.")
 
@@ -1,15 +1,101 @@
 import streamlit as st, datetime, calendar
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
-# ─── engine (cached) ───────────────────────────────────────────
-if "pg_engine" not in st.session_state:
-    st.session_state.pg_engine = create_engine(
-        st.secrets["neon"]["dsn"], pool_pre_ping=True, echo=False
-    )
-engine = st.session_state.pg_engine
+from db_handler import get_engine
+
+# ─── engine (shared across pages & sessions) ───────────────────
+engine = get_engine()
 SHIFT_HOURS = 8.5
 
+# ─── SQL (module-level: built once, not per rerun) ─────────────
+SQL_MONTH = text("""
+WITH adj AS (
+    SELECT employeeid,
+           SUM(CASE WHEN txn_type='bonus' THEN amount END) AS bonus,
+           SUM(CASE WHEN txn_type='extra' THEN amount END) AS extra,
+           SUM(CASE WHEN txn_type='fine'  THEN amount END) AS fine,
+           STRING_AGG(reason, '; ' ORDER BY txn_date)      AS reasons
+    FROM hr_salary_log
+    WHERE txn_date BETWEEN :s AND :e
+    GROUP BY employeeid
+),
+att AS (
+    SELECT employeeid,
+           SUM(EXTRACT(EPOCH FROM (COALESCE(clock_out,clock_in)-clock_in)))/3600 AS worked
+    FROM hr_attendance
+    WHERE punch_date BETWEEN :s AND :e
+    GROUP BY employeeid
+),
+base AS (
+    SELECT DISTINCT ON (employeeid)
+           employeeid, salary
+    FROM   hr_salary_history
+    WHERE  effective_from <= :s
+      AND  COALESCE(effective_to, DATE '9999-12-31') >= :s
+    ORDER  BY employeeid, effective_from DESC
+)
+SELECT  emp.employeeid,
+        emp.fullname,
+        COALESCE(base.salary, 0)                AS base,
+        COALESCE(adj.bonus ,0)                  AS bonus,
+        COALESCE(adj.extra ,0)                  AS extra,
+        COALESCE(adj.fine  ,0)                  AS fine,
+        COALESCE(att.worked,0)                  AS worked,
+        :req                                    AS required,
+        COALESCE(att.worked,0) - :req           AS delta,
+        COALESCE(adj.reasons,'')                AS reasons
+FROM hr_employee emp
+LEFT JOIN base ON base.employeeid = emp.employeeid
+LEFT JOIN adj  ON adj.employeeid  = emp.employeeid
+LEFT JOIN att  ON att.employeeid  = emp.employeeid
+ORDER BY emp.fullname;
+""")
+
+SQL_CLOSE_SALARY = text("""
+UPDATE hr_salary_history
+   SET effective_to = :close
+ WHERE employeeid   = :eid
+   AND effective_to IS NULL
+""")
+
+SQL_NEW_SALARY = text("""
+INSERT INTO hr_salary_history
+      (employeeid, salary, effective_from, reason)
+VALUES (:eid, :sal, :eff, :rsn)
+""")
+
+SQL_ADD_TXN = text("""
+INSERT INTO hr_salary_log (employeeid, txn_date, amount, txn_type, reason)
+VALUES (:eid, :dt, :amt, :kind, :rsn)
+""")
+
+SQL_CURRENT_SALARY = text("""
+SELECT salary, effective_from
+  FROM hr_salary_history
+ WHERE employeeid = :eid
+   AND effective_from <= CURRENT_DATE
+   AND (effective_to IS NULL OR effective_to >= CURRENT_DATE)
+ ORDER BY effective_from DESC
+ LIMIT 1
+""")
+
+SQL_PUSHED_COUNT = text("SELECT COUNT(*) FROM hr_salary_pushed WHERE month = :m")
+
+SQL_BASE_REASONS = text("""
+SELECT employeeid, reason
+  FROM hr_salary_history
+ WHERE effective_from <= :month
+   AND (effective_to IS NULL OR effective_to >= :month)
+""")
+
+SQL_PUSH_ROW = text("""
+INSERT INTO hr_salary_pushed
+  (employeeid, month, base, bonus, extra, fine, net, note, created_by)
+VALUES
+  (:eid, :month, :base, :bonus, :extra, :fine, :net, :note, :created_by)
+""")
+
 # ─── helpers ───────────────────────────────────────────────────
 def month_bounds(anchor: datetime.date):
     start = anchor.replace(day=1)
@@ -18,49 +104,7 @@ def month_bounds(anchor: datetime.date):
 
 @st.cache_data(show_spinner=False)
 def fetch_month(start_d, end_d, req_h):
-    sql = text("""
-    WITH adj AS (
-        SELECT employeeid,
-               SUM(CASE WHEN txn_type='bonus' THEN amount END) AS bonus,
-               SUM(CASE WHEN txn_type='extra' THEN amount END) AS extra,
-               SUM(CASE WHEN txn_type='fine'  THEN amount END) AS fine,
-               STRING_AGG(reason, '; ' ORDER BY txn_date)      AS reasons
-        FROM hr_salary_log
-        WHERE txn_date BETWEEN :s AND :e
-        GROUP BY employeeid
-    ),
-    att AS (
-        SELECT employeeid,
-               SUM(EXTRACT(EPOCH FROM (COALESCE(clock_out,clock_in)-clock_in)))/3600 AS worked
-        FROM hr_attendance
-        WHERE punch_date BETWEEN :s AND :e
-        GROUP BY employeeid
-    ),
-    base AS (
-        SELECT DISTINCT ON (employeeid)
-               employeeid, salary
-        FROM   hr_salary_history
-        WHERE  effective_from <= :s
-          AND  COALESCE(effective_to, DATE '9999-12-31') >= :s
-        ORDER  BY employeeid, effective_from DESC
-    )
-    SELECT  emp.employeeid,
-            emp.fullname,
-            COALESCE(base.salary, 0)                AS base,
-            COALESCE(adj.bonus ,0)                  AS bonus,
-            COALESCE(adj.extra ,0)                  AS extra,
-            COALESCE(adj.fine  ,0)                  AS fine,
-            COALESCE(att.worked,0)                  AS worked,
-            :req                                    AS required,
-            COALESCE(att.worked,0) - :req           AS delta,
-            COALESCE(adj.reasons,'')                AS reasons
-    FROM hr_employee emp
-    LEFT JOIN base ON base.employeeid = emp.employeeid
-    LEFT JOIN adj  ON adj.employeeid  = emp.employeeid
-    LEFT JOIN att  ON att.employeeid  = emp.employeeid
-    ORDER BY emp.fullname;
-    """)
-    df = pd.read_sql(sql, engine,
+    df = pd.read_sql(SQL_MONTH, engine,
                      params={"s": start_d, "e": end_d, "req": req_h})
     df["net"] = df["base"] + df["bonus"] + df["extra"] - df["fine"]
     return df
@@ -69,29 +113,14 @@ def close_current_and_insert_raise(eid:int, new_salary:float,
                                    eff_from:datetime.date, reason:str):
     """Close previous salary row and insert the new one inside a TX."""
     close_date = eff_from - datetime.timedelta(days=1)
-    sql_close = text("""
-        UPDATE hr_salary_history
-           SET effective_to = :close
-         WHERE employeeid   = :eid
-           AND effective_to IS NULL
-    """)
-    sql_new  = text("""
-        INSERT INTO hr_salary_history
-              (employeeid, salary, effective_from, reason)
-        VALUES (:eid, :sal, :eff, :rsn)
-    """)
     with engine.begin() as con:
-        con.execute(sql_close, {"close": close_date, "eid": eid})
-        con.execute(sql_new,
+        con.execute(SQL_CLOSE_SALARY, {"close": close_date, "eid": eid})
+        con.execute(SQL_NEW_SALARY,
                     {"eid": eid, "sal": new_salary, "eff": eff_from, "rsn": reason})
 
 def add_txn(eid: int, dt: datetime.date, amt: float, kind: str, rsn: str):
-    sql = text("""
-        INSERT INTO hr_salary_log (employeeid, txn_date, amount, txn_type, reason)
-        VALUES (:eid, :dt, :amt, :kind, :rsn)
-    """)
     with engine.begin() as con:
-        con.execute(sql, {"eid": eid, "dt": dt, "amt": amt, "kind": kind, "rsn": rsn})
+        con.execute(SQL_ADD_TXN, {"eid": eid, "dt": dt, "amt": amt, "kind": kind, "rsn": rsn})
 
 # ────────────────────── UI ───────────────────────────────────────
 st.set_page_config(page_title="Employee Salary", page_icon="💰", layout="wide")
@@ -146,18 +175,21 @@ with tab_sum:
     even_bg = "#f7f9fc"     # light gray-blue
     odd_bg  = "#ffffff"
 
-    for i, r in df.iterrows():
+    # plain tuples, no Series built per row
+    rows = df[["employeeid", "fullname", "base", "bonus", "extra", "fine", "net", "reasons"]]
+    for i, (eid, name, base, bonus, extra, fine, net, reasons) in enumerate(
+            rows.itertuples(index=False, name=None)):
         row_bg = even_bg if i % 2 == 0 else odd_bg
         cols   = st.columns(widths)
-        eid    = int(r["employeeid"])
+        eid    = int(eid)
 
-        cols[0].markdown(cell(r["fullname"], row_bg), unsafe_allow_html=True)
-        cols[1].markdown(cell(fmt(r["base" ]), row_bg), unsafe_allow_html=True)
-        cols[2].markdown(cell(fmt(r["bonus"]), row_bg), unsafe_allow_html=True)
-        cols[3].markdown(cell(fmt(r["extra"]), row_bg), unsafe_allow_html=True)
-        cols[4].markdown(cell(fmt(r["fine" ]), row_bg), unsafe_allow_html=True)
-        cols[5].markdown(cell(fmt(r["net"  ]), row_bg), unsafe_allow_html=True)
-        cols[6].markdown(cell(r["reasons"] or "—", row_bg), unsafe_allow_html=True)
+        cols[0].markdown(cell(name, row_bg), unsafe_allow_html=True)
+        cols[1].markdown(cell(fmt(base ), row_bg), unsafe_allow_html=True)
+        cols[2].markdown(cell(fmt(bonus), row_bg), unsafe_allow_html=True)
+        cols[3].markdown(cell(fmt(extra), row_bg), unsafe_allow_html=True)
+        cols[4].markdown(cell(fmt(fine ), row_bg), unsafe_allow_html=True)
+        cols[5].markdown(cell(fmt(net  ), row_bg), unsafe_allow_html=True)
+        cols[6].markdown(cell(reasons or "—", row_bg), unsafe_allow_html=True)
 
         # edit-adjustment button (unchanged)
         if cols[-1].button("✏️", key=f"edit_adj_{eid}", help="Edit bonus / extra / fine"):
@@ -220,17 +252,8 @@ with tab_raise:
         emp_id   = int(emp_df.loc[emp_df["fullname"] == emp_name, "employeeid"].iloc[0])
 
         # ── look up current salary ───────────────────────────────
-        cur_sql = text("""
-            SELECT salary, effective_from
-              FROM hr_salary_history
-             WHERE employeeid = :eid
-               AND effective_from <= CURRENT_DATE
-               AND (effective_to IS NULL OR effective_to >= CURRENT_DATE)
-             ORDER BY effective_from DESC
-             LIMIT 1
-        """)
         with engine.connect() as con:
-            cur_row = con.execute(cur_sql, {"eid": emp_id}).fetchone()
+            cur_row = con.execute(SQL_CURRENT_SALARY, {"eid": emp_id}).fetchone()
 
         cur_sal  = float(cur_row.salary) if cur_row else 0.0
         cur_from = cur_row.effective_from if cur_row else None
@@ -322,9 +345,8 @@ with tab_push:
     req_hours = SHIFT_HOURS * (days - 4)
 
     # ── check if already pushed ─────────────────────────────────
-    check_sql = text("SELECT COUNT(*) FROM hr_salary_pushed WHERE month = :m")
     with engine.connect() as con:
-        already_pushed = con.execute(check_sql, {"m": month_first}).scalar() > 0
+        already_pushed = con.execute(SQL_PUSHED_COUNT, {"m": month_first}).scalar() > 0
 
     # ── status card ─────────────────────────────────────────────
     card_bg  = "#d4edda" if already_pushed else "#fff3cd"  # green / yellow
@@ -345,24 +367,18 @@ with tab_push:
 
     # ── compile notes (raise + adjustments) ────────────────────
     base_reasons = {}
-    base_sql = text("""
-        SELECT employeeid, reason
-          FROM hr_salary_history
-         WHERE effective_from <= :month
-           AND (effective_to IS NULL OR effective_to >= :month)
-    """)
     with engine.connect() as con:
-        for row in con.execute(base_sql, {"month": month_first}):
+        for row in con.execute(SQL_BASE_REASONS, {"month": month_first}):
             base_reasons[row.employeeid] = row.reason
 
     notes = []
-    for _, r in df.iterrows():
+    for eid, reasons in df[["employeeid", "reasons"]].itertuples(index=False, name=None):
         parts = []
-        rn = base_reasons.get(int(r["employeeid"]), "")
+        rn = base_reasons.get(int(eid), "")
         if rn:
             parts.append(f"Raise/Cut: {rn}")
-        if r["reasons"]:
-            parts.append(f"Adj.: {r['reasons']}")
+        if reasons:
+            parts.append(f"Adj.: {reasons}")
         notes.append(" | ".join(parts) if parts else "")
 
     # ── build preview dataframe  ───────────────────────────────
@@ -386,13 +402,13 @@ with tab_push:
     for lbl, col in zip(header_labels, st.columns(widths)):
         col.markdown(f"**{lbl}**")
 
-    for i, r in df_prev.iterrows():
-        bg = teal_bg if r["fullname"] == "Totals" else (even_bg if i % 2 == 0 else odd_bg)
+    for i, (name, *amounts, note) in enumerate(df_prev.itertuples(index=False, name=None)):
+        bg = teal_bg if name == "Totals" else (even_bg if i % 2 == 0 else odd_bg)
         cols = st.columns(widths)
-        cols[0].markdown(cell(r["fullname"], bg), unsafe_allow_html=True)
-        for j, key in enumerate(["base", "bonus", "extra", "fine", "net"], start=1):
-            cols[j].markdown(cell(fmt(r[key]), bg), unsafe_allow_html=True)
-        cols[6].markdown(cell(r["note"], bg), unsafe_allow_html=True)
+        cols[0].markdown(cell(name, bg), unsafe_allow_html=True)
+        for j, amount in enumerate(amounts, start=1):     # base … net
+            cols[j].markdown(cell(fmt(amount), bg), unsafe_allow_html=True)
+        cols[6].markdown(cell(note, bg), unsafe_allow_html=True)
 
     # ── push logic ─────────────────────────────────────────────
     if already_pushed:
@@ -403,23 +419,20 @@ with tab_push:
         )
         if st.button("Push all to Finance (Finalize)", type="primary"):
             with engine.begin() as con:
-                for idx, row in df.iterrows():
+                push_df = df[["employeeid", "base", "bonus", "extra", "fine", "net"]]
+                for (eid, base, bonus, extra, fine, net), note in zip(
+                        push_df.itertuples(index=False, name=None), notes):
                     con.execute(
-                        text("""
-                            INSERT INTO hr_salary_pushed
-                              (employeeid, month, base, bonus, extra, fine, net, note, created_by)
-                            VALUES
-                              (:eid, :month, :base, :bonus, :extra, :fine, :net, :note, :created_by)
-                        """),
+                        SQL_PUSH_ROW,
                         {
-                            "eid": int(row["employeeid"]),
+                            "eid": int(eid),
                             "month": month_first,
-                            "base":  float(row["base"]),
-                            "bonus": float(row["bonus"]),
-                            "extra": float(row["extra"]),
-                            "fine":  float(row["fine"]),
-                            "net":   float(row["net"]),
-                            "note":  notes[idx],
+                            "base":  float(base),
+                            "bonus": float(bonus),
+                            "extra": float(extra),
+                            "fine":  float(fine),
+                            "net":   float(net),
+                            "note":  note,
                             "created_by": st.session_state.get("user", "hr"),
                         },
                     )